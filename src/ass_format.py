@@ -1,12 +1,15 @@
-from datetime import timedelta
+import functools
 
 import webcolors
 
+# Curly braces start override blocks in ASS.
+_ASS_ESCAPES = str.maketrans({"{": r"\{", "}": r"\}"})
+
 def escape_ass_text(text: str) -> str:
     """Escape text for ASS Dialogue lines (minimal escaping)."""
-    # Curly braces start override blocks in ASS.
-    return text.replace("{", r"\{").replace("}", r"\}")
+    return text.translate(_ASS_ESCAPES)
 
+@functools.lru_cache(maxsize=256)
 def ass_color(color_value: str, *, keep_alpha: bool = False) -> str:
     """
     Convert a CSS-ish color string into ASS color format (&H[AABBGGRR]).
@@ -37,10 +40,10 @@ def ass_color(color_value: str, *, keep_alpha: bool = False) -> str:
             hexv = hexv[0:6]
 
         if len(hexv) == 6:
-            r = int(hexv[0:2], 16)
-            g = int(hexv[2:4], 16)
-            b = int(hexv[4:6], 16)
-            return f"&H{alpha}{b:02X}{g:02X}{r:02X}"
+            # The value is already hex: validate + canonicalize case in one
+            # C call, then reorder RRGGBB -> BBGGRR by slicing.
+            h = bytes.fromhex(hexv).hex().upper()
+            return f"&H{alpha}{h[4:6]}{h[2:4]}{h[0:2]}"
 
         return "&H00FFFFFF"
 
@@ -63,15 +66,12 @@ def split_ass_color(ass: str) -> tuple[str, str]:
         return s[0:2], s[2:8]
     return "00", "000000"
 
-def format_time(td: timedelta) -> str:
-    """Format a timedelta into ASS/SSA time format (H:MM:SS.cc).
+def format_time(total_ms: int) -> str:
+    """Format integer milliseconds into ASS/SSA time format (H:MM:SS.cc).
 
     Note: ASS event timestamps use centiseconds (1/100s), not milliseconds.
     VLC/libass may misinterpret a `.mmm` suffix as centiseconds, causing large overlaps.
     """
-    # Work in integer milliseconds to avoid float rounding.
-    total_ms = td.days * 86_400_000 + td.seconds * 1000 + (td.microseconds // 1000)
-
     total_seconds, ms_remainder = divmod(total_ms, 1000)
     hours, remainder = divmod(total_seconds, 3600)
     minutes, seconds = divmod(remainder, 60)
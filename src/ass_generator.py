@@ -1,62 +1,84 @@
 import os
-from datetime import timedelta
+from operator import itemgetter
 
 from ass_format import ass_color, escape_ass_text, format_time
 from ass_renderer import create_bg_event, wrap_ass_text, get_max_units_per_line
 from config_validation import ensure_no_timing_keys, ensure_no_visual_keys, is_timestamp_name
 from effective_config import get_effective_speaker_bool, get_effective_speaker_int
-from ini_parsing import (
-    load_acronyms,
-    load_waypoints,
-    parse_comms_lines,
-    parse_ini_non_comms,
-)
-from speech_estimation import estimate_duration
+from ini_parsing import parse_ini_all
+from speech_estimation import estimate_duration_ms
 from style import get_speaker_style, position_to_alignment
-from timestamp import parse_timestamp_to_timedelta
+from timestamp import make_timestamp_parser
 from visual_substitution import apply_visual_substitutions
 
+# Shared shape of every Dialogue event; printf-style formatting avoids
+# re-interpreting an f-string per emitted line.
+_DIALOGUE_FMT = "Dialogue: %d,%s,%s,%s,%s,0,0,0,,{\\q2}%s"
+
+# Fixed header lines; only the PlayRes values vary per run.
+_SCRIPT_INFO_HEADER = (
+    "[Script Info]",
+    "Title: Comms Subtitles",
+    "ScriptType: v4.00+",
+    "WrapStyle: 2",
+)
+_STYLES_HEADER = (
+    "[V4+ Styles]",
+    "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+    # Default Style
+    "Style: Default,Arial,56,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,2,2,1,10,10,10,1",
+)
+_EVENTS_HEADER = (
+    "[Events]",
+    "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+)
+
 def generate_ass(input_path: str = "comms.ini", output_path: str = "comms.ass") -> dict:
     # Read INI into memory once
     with open(input_path, "r", encoding="utf-8") as _f:
-        ini_lines = _f.readlines()
+        ini_text = _f.read()
 
-    config = parse_ini_non_comms(lines=ini_lines)
-    comms_lines = parse_comms_lines(lines=ini_lines)
+    sections, comms_lines, waypoints = parse_ini_all(ini_text)
 
     # Global rendering options
-    render_section = "render"
-    play_res_x = int(config.get(render_section, "play_res_x", fallback="1920"))
-    play_res_y = int(config.get(render_section, "play_res_y", fallback="1080"))
-    wrap_width_ratio = float(config.get(render_section, "wrap_width_ratio", fallback="0.75"))
+    render = sections.get("render", {})
+    play_res_x = int(render.get("play_res_x", "1920"))
+    play_res_y = int(render.get("play_res_y", "1080"))
+    wrap_width_ratio = float(render.get("wrap_width_ratio", "0.75"))
     wrap_width_ratio = min(1.0, max(0.10, wrap_width_ratio))
 
     ass_file: list[str] = []
 
     # [Script Info]
-    ass_file.append("[Script Info]")
-    ass_file.append("Title: Comms Subtitles")
-    ass_file.append("ScriptType: v4.00+")
-    ass_file.append("WrapStyle: 2")
+    ass_file.extend(_SCRIPT_INFO_HEADER)
     ass_file.append(f"PlayResX: {play_res_x}")
     ass_file.append(f"PlayResY: {play_res_y}")
     ass_file.append("")
 
     # [V4+ Styles]
-    ass_file.append("[V4+ Styles]")
-    ass_file.append(
-        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding"
-    )
-
-    # Default Style
-    ass_file.append(
-        "Style: Default,Arial,56,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,2,2,1,10,10,10,1"
-    )
-
-    types = {}
-    for s in config.sections():
-        if s.startswith("metaTypes.") or s.startswith("speakerTypes."):
-            types[s.split(".", 1)[1].strip()] = dict(config.items(s))
+    ass_file.extend(_STYLES_HEADER)
+
+    # Bucket prefixed sections in one sweep instead of a scan per prefix.
+    types: dict[str, dict[str, str]] = {}
+    speakers: dict[str, dict[str, str]] = {}
+    meta: dict[str, dict[str, str]] = {}
+    acronyms: dict[str, str] = {}
+    for s, items in sections.items():
+        prefix, dot, rest = s.partition(".")
+        if not dot:
+            continue
+        if prefix in ("metaTypes", "speakerTypes"):
+            types[rest.strip()] = items
+        elif prefix == "speakers":
+            speakers[s.split(".")[-1]] = items
+        elif prefix == "meta":
+            meta[s.split(".")[-1]] = items
+        elif prefix == "acronyms":
+            # [acronyms.FL] extension = Flight Level  ->  {"FL": "Flight Level"}
+            key = rest.strip().upper()
+            ext = items.get("extension", "").strip()
+            if key and ext:
+                acronyms[key] = ext
 
     # Validate types
     for tname, tinfo in types.items():
@@ -65,10 +87,6 @@ def generate_ass(input_path: str = "comms.ini", output_path: str = "comms.ass")
         else:
             ensure_no_timing_keys(tinfo, f"Type '{tname}'")
 
-    speakers = {
-        s.split(".")[-1]: dict(config.items(s)) for s in config.sections() if s.startswith("speakers.")
-    }
-
     speaker_keys_with_name_prefix: set[str] = set()
     for sk in speakers.keys():
         if get_effective_speaker_bool(
@@ -81,8 +99,6 @@ def generate_ass(input_path: str = "comms.ini", output_path: str = "comms.ass")
         ):
             speaker_keys_with_name_prefix.add(sk)
 
-    meta = {s.split(".")[-1]: dict(config.items(s)) for s in config.sections() if s.startswith("meta.")}
-
     timestamp_meta_keys = set()
     for mk, mv in meta.items():
         mtype = (mv.get("type") or "").strip()
@@ -94,19 +110,20 @@ def generate_ass(input_path: str = "comms.ini", output_path: str = "comms.ass")
         else:
             ensure_no_timing_keys(mv, f"Meta '{mk}' has type '{mtype}'")
 
-    acronyms = load_acronyms(config)
-    waypoints = load_waypoints(lines=ini_lines)
-    literal_waypoints = set()
-    for s in waypoints.values():
-        literal_waypoints.update(w.upper() for w in s)
+    literal_waypoints = frozenset(w.upper() for s in waypoints.values() for w in s)
 
     max_units_per_line = get_max_units_per_line(play_res_x, wrap_width_ratio)
 
     style_render: dict[str, dict[str, object]] = {}
 
+    # Display names only depend on the key, so resolve + escape them here while
+    # the style dict is in hand instead of re-resolving styles later.
+    escaped_display_name: dict[str, str] = {}
+
     style_keys = list(speakers.keys()) + [k for k in meta.keys() if k not in timestamp_meta_keys]
     for speaker_key in style_keys:
         style = get_speaker_style(speaker_key, speakers, types, meta)
+        escaped_display_name[speaker_key] = escape_ass_text(style["display_name"])
 
         color = ass_color(style["color"])
 
@@ -143,24 +160,37 @@ def generate_ass(input_path: str = "comms.ini", output_path: str = "comms.ass")
     ass_file.append("")
 
     # [Events]
-    ass_file.append("[Events]")
-    ass_file.append("Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text")
+    ass_file.extend(_EVENTS_HEADER)
 
-    current_time = timedelta()
-    fallback_duration = timedelta(milliseconds=1)
+    # All event timing below is integer milliseconds, parsed as such at the
+    # T= marker boundary.
+    fallback_duration_ms = 1
 
-    # First pass: timestamp markers
-    ts_info = {k: types.get((meta[k].get("type") or "").strip(), {}) for k in timestamp_meta_keys}
-    markers: list[tuple[int, timedelta, float]] = []
+    known_speakers = set(speakers.keys()) | (set(meta.keys()) - timestamp_meta_keys)
+
+    # First pass: collect timestamp markers and validate speaker keys together.
+    # Preparation below only rewrites values, never keys, so validating here is
+    # equivalent to validating the prepared lines.
+    # Each timestamp type's format is fixed for the whole run, so bind a
+    # specialized parser per key once instead of re-dispatching on the format
+    # string for every T= line.
+    ts_info: dict[str, tuple] = {}
+    for k in timestamp_meta_keys:
+        info = types.get((meta[k].get("type") or "").strip(), {})
+        ts_info[k] = (
+            make_timestamp_parser(info.get("format", "mm:ss")),
+            float(info.get("cps", "15")),
+        )
+    markers_by_index: dict[int, tuple[int, float]] = {}
     for idx, (key, value) in enumerate(comms_lines):
         info = ts_info.get(key)
-        if not info:
-            continue
-        t_fmt = info.get("format", "mm:ss")
-        cps = float(info.get("cps", "15"))
-        markers.append((idx, parse_timestamp_to_timedelta(value, t_fmt), cps))
+        if info:
+            parse_ts, cps = info
+            markers_by_index[idx] = (parse_ts(value), cps)
+        elif key not in known_speakers:
+            raise ValueError(f"Unknown speaker key {key!r} in [comms] at index {idx}")
 
-    marker_indices = {midx for midx, _t, _c in markers}
+    marker_indices = markers_by_index.keys()
 
     comms_lines_prepared = apply_visual_substitutions(
         comms_lines=comms_lines,
@@ -171,27 +201,39 @@ def generate_ass(input_path: str = "comms.ini", output_path: str = "comms.ass")
         speaker_keys_with_name_prefix=speaker_keys_with_name_prefix,
     )
 
-    def next_marker_time(after_idx: int):
-        for midx, t, _ in markers:
-            if midx > after_idx:
-                return t
-        return None
-
-    known_speakers = set(speakers.keys()) | (set(meta.keys()) - timestamp_meta_keys)
-    for idx, (k, _v) in enumerate(comms_lines_prepared):
-        if idx in marker_indices:
-            continue
-        if k not in known_speakers:
-            raise ValueError(f"Unknown speaker key {k!r} in [comms] at index {idx}")
-
-    markers_by_index = {midx: (t, cps) for midx, t, cps in markers}
+    # Marker indices are collected in ascending order and the block loop visits
+    # them strictly in order, so the "next marker" is a pointer advance rather
+    # than a per-block search.
+    marker_idx_list = list(markers_by_index)
+    marker_time_list = [markers_by_index[midx][0] for midx in marker_idx_list]
 
     # Second pass: generate dialogue lines with rails
     meta_non_timestamp_keys = set(meta.keys()) - timestamp_meta_keys
     speaker_keys = set(speakers.keys())
 
-    def _scale_durations_to_fit(durations: list[timedelta], max_ms: int) -> list[int]:
-        est_ms = [max(1, int(d.total_seconds() * 1000)) for d in durations]
+    # Meta types are fixed per key, so resolve the "comment" classification
+    # once instead of re-lowering the type string for every message in every
+    # block.
+    comment_meta_keys = {
+        k for k in meta_non_timestamp_keys
+        if (meta[k].get("type") or "").strip().lower() == "comment"
+    }
+
+    # Acronyms/waypoints are fixed for this run, so identical (text, cps) pairs
+    # always produce the same estimate; cache them to avoid re-tokenizing
+    # repeated messages ("Roger", call signs, ...).
+    duration_cache: dict[tuple[str, float], int] = {}
+
+    def estimate_duration_cached(text: str, cps: float) -> int:
+        key = (text, cps)
+        cached = duration_cache.get(key)
+        if cached is None:
+            cached = estimate_duration_ms(text, cps=cps, acronyms=acronyms, waypoints=literal_waypoints)
+            duration_cache[key] = cached
+        return cached
+
+    def _scale_durations_to_fit(durations: list[int], max_ms: int) -> list[int]:
+        est_ms = [max(1, ms) for ms in durations]
         sum_est = sum(est_ms)
 
         if max_ms <= 0 or sum_est <= max_ms:
@@ -200,36 +242,112 @@ def generate_ass(input_path: str = "comms.ini", output_path: str = "comms.ass")
         scale = max_ms / max(1, sum_est)
         scaled_ms = [max(1, int(ms * scale)) for ms in est_ms]
 
+        # Absorb rounding drift front-to-back, draining each entry down to its
+        # 1 ms floor before touching the next — one bulk subtraction per entry
+        # instead of a 1 ms-at-a-time spin.
         drift = sum(scaled_ms) - max_ms
-        k = 0
-        while drift > 0 and k < len(scaled_ms):
-            if scaled_ms[k] > 1:
-                scaled_ms[k] -= 1
-                drift -= 1
-            else:
-                k += 1
+        for k in range(len(scaled_ms)):
+            if drift <= 0:
+                break
+            take = min(drift, scaled_ms[k] - 1)
+            if take > 0:
+                scaled_ms[k] -= take
+                drift -= take
 
         return scaled_ms
 
-    pending_events: list[tuple[timedelta, int, str]] = []
+    # Wrapping and escaping are pure in the text, so compute them once per
+    # distinct message; repeated messages ("Roger", ...) become a dict hit.
+    # Escaping must come after wrapping: width measurement has to see the
+    # original characters, not the inserted backslashes.
+    wrap_cache: dict[str, tuple[str, int, float]] = {}
+
+    def wrap_and_escape(text: str) -> tuple[str, int, float]:
+        cached = wrap_cache.get(text)
+        if cached is None:
+            wrapped, line_count, max_units = wrap_ass_text(text, max_units_per_line)
+            cached = (escape_ass_text(wrapped), line_count, max_units)
+            wrap_cache[text] = cached
+        return cached
+
+    pending_events: list[tuple[int, int, str]] = []
 
     # track earliest start and latest end for metadata
     earliest_start = None
     latest_end = None
 
+    def emit_rail(msgs: list[tuple[str, str]], durations: list[int], start_ms: int, layer: int) -> None:
+        """Emit one rail's Dialogue (+ background) events back to back from start_ms.
+
+        Within a rail each line starts where the previous one ended, so the
+        formatted end string doubles as the next start.
+        """
+        nonlocal earliest_start, latest_end
+
+        # Local bindings keep the per-line loop on LOAD_FAST lookups.
+        fmt_time = format_time
+        append_event = pending_events.append
+
+        current = start_ms
+        start_str = fmt_time(start_ms)
+        for (mkey, mval), dur_ms in zip(msgs, durations, strict=True):
+            start_time = current
+            end_time = start_time + (dur_ms if dur_ms > 0 else fallback_duration_ms)
+            end_str = fmt_time(end_time)
+
+            # update metadata tracking
+            if earliest_start is None or start_time < earliest_start:
+                earliest_start = start_time
+            if latest_end is None or end_time > latest_end:
+                latest_end = end_time
+
+            escaped_text, line_count, max_units = wrap_and_escape(mval)
+
+            # Most keys have no background; skip the call outright instead of
+            # letting create_bg_event return None per message.
+            sr = style_render.get(mkey)
+            if sr and sr["has_bg"]:
+                bg_ev = create_bg_event(
+                    sr=sr,
+                    line_count=line_count,
+                    max_line_units=max_units,
+                    start_ms=start_time,
+                    end_ms=end_time,
+                    play_res_x=play_res_x,
+                    play_res_y=play_res_y,
+                )
+                if bg_ev:
+                    append_event(bg_ev)
+
+            line = _DIALOGUE_FMT % (
+                layer,
+                start_str,
+                end_str,
+                mkey,
+                escaped_display_name[mkey],
+                escaped_text,
+            )
+            append_event((start_time, layer, line))
+            current = end_time
+            start_str = end_str
+
+    n_lines = len(comms_lines_prepared)
     i = 0
-    while i < len(comms_lines_prepared):
+    m_ptr = 0  # position of the current block's marker in marker_idx_list
+    while i < n_lines:
         if i not in markers_by_index:
             raise ValueError("First [comms] entry must be a timestamp marker (e.g. T=...).")
 
         block_start, block_cps = markers_by_index[i]
-        block_end = next_marker_time(i)
+        if m_ptr + 1 < len(marker_idx_list):
+            j = marker_idx_list[m_ptr + 1]
+            block_end = marker_time_list[m_ptr + 1]
+        else:
+            j = n_lines
+            block_end = None
+        m_ptr += 1
 
-        j = i + 1
-        block_msgs: list[tuple[str, str]] = []
-        while j < len(comms_lines_prepared) and j not in marker_indices:
-            block_msgs.append(comms_lines_prepared[j])
-            j += 1
+        block_msgs = comms_lines_prepared[i + 1 : j]
 
         if not block_msgs:
             i = j
@@ -244,130 +362,51 @@ def generate_ass(input_path: str = "comms.ini", output_path: str = "comms.ass")
                 speaker_msgs.append((mkey, mval))
 
         is_bounded = block_end is not None and block_end > block_start
-        max_ms = int((block_end - block_start).total_seconds() * 1000) if is_bounded else 0
+        max_ms = (block_end - block_start) if is_bounded else 0
 
         # Speakers rail
-        speaker_est = [
-            estimate_duration(mval, cps=block_cps, acronyms=acronyms, waypoints=literal_waypoints)
-            for _, mval in speaker_msgs
-        ]
+        speaker_est = [estimate_duration_cached(mval, block_cps) for _, mval in speaker_msgs]
         if is_bounded:
             speaker_ms = _scale_durations_to_fit(speaker_est, max_ms)
         else:
-            speaker_ms = [max(1, int(d.total_seconds() * 1000)) for d in speaker_est]
+            speaker_ms = [max(1, ms) for ms in speaker_est]
 
         # Meta rail
-        meta_est: list[timedelta] = []
+        meta_est: list[int] = []
         for mkey, mval in meta_msgs:
-            mtype = (meta.get(mkey, {}).get("type") or "").strip().lower()
-            if mtype == "comment":
+            if mkey in comment_meta_keys:
                 text = mval or ""
                 seconds = len(text) / max(0.001, block_cps)
-                meta_est.append(timedelta(milliseconds=int(seconds * 1000)))
+                meta_est.append(int(seconds * 1000))
             else:
-                meta_est.append(
-                    estimate_duration(mval, cps=block_cps, acronyms=acronyms, waypoints=literal_waypoints)
-                )
+                meta_est.append(estimate_duration_cached(mval, block_cps))
         if is_bounded:
             meta_ms = _scale_durations_to_fit(meta_est, max_ms)
         else:
-            meta_ms = [max(1, int(d.total_seconds() * 1000)) for d in meta_est]
-
-        # Emit speaker rail
-        speakers_current = block_start
-        for (mkey, mval), dur_ms in zip(speaker_msgs, speaker_ms, strict=True):
-            start_time = speakers_current
-            end_time = start_time + timedelta(
-                milliseconds=dur_ms if dur_ms > 0 else int(fallback_duration.total_seconds() * 1000)
-            )
-
-            # update metadata tracking
-            if earliest_start is None or start_time < earliest_start:
-                earliest_start = start_time
-            if latest_end is None or end_time > latest_end:
-                latest_end = end_time
-
-            text_val = mval
-            wrapped_text, line_count, max_units = wrap_ass_text(text_val, max_units_per_line)
-
-            sr = style_render.get(mkey) or {}
-            
-            bg_ev = create_bg_event(
-                sr=sr,
-                line_count=line_count,
-                max_line_units=max_units,
-                start=start_time,
-                end=end_time,
-                play_res_x=play_res_x,
-                play_res_y=play_res_y,
-            )
-            if bg_ev:
-                pending_events.append(bg_ev)
+            meta_ms = [max(1, ms) for ms in meta_est]
 
-            line = (
-                f"Dialogue: 0,{format_time(start_time)},{format_time(end_time)},{mkey},"
-                f"{escape_ass_text(get_speaker_style(mkey, speakers, types, meta)['display_name'])},0,0,0,,"
-                f"{{\\q2}}{escape_ass_text(wrapped_text)}"
-            )
-            pending_events.append((start_time, 0, line))
-            speakers_current = end_time
-
-        # Emit meta rail
-        meta_current = block_start
-        for (mkey, mval), dur_ms in zip(meta_msgs, meta_ms, strict=True):
-            start_time = meta_current
-            end_time = start_time + timedelta(
-                milliseconds=dur_ms if dur_ms > 0 else int(fallback_duration.total_seconds() * 1000)
-            )
-
-            # update metadata tracking
-            if earliest_start is None or start_time < earliest_start:
-                earliest_start = start_time
-            if latest_end is None or end_time > latest_end:
-                latest_end = end_time
-
-            text_val = mval
-            wrapped_text, line_count, max_units = wrap_ass_text(text_val, max_units_per_line)
-
-            sr = style_render.get(mkey) or {}
-
-            bg_ev = create_bg_event(
-                sr=sr,
-                line_count=line_count,
-                max_line_units=max_units,
-                start=start_time,
-                end=end_time,
-                play_res_x=play_res_x,
-                play_res_y=play_res_y,
-            )
-            if bg_ev:
-                pending_events.append(bg_ev)
-
-            line = (
-                f"Dialogue: 1,{format_time(start_time)},{format_time(end_time)},{mkey},"
-                f"{escape_ass_text(get_speaker_style(mkey, speakers, types, meta)['display_name'])},0,0,0,,"
-                f"{{\\q2}}{escape_ass_text(wrapped_text)}"
-            )
-            pending_events.append((start_time, 1, line))
-            meta_current = end_time
+        emit_rail(speaker_msgs, speaker_ms, block_start, layer=0)
+        emit_rail(meta_msgs, meta_ms, block_start, layer=1)
 
         i = j
 
-    pending_events.sort(key=lambda t: (t[0], t[1]))
-    for _start, _layer, line in pending_events:
-        ass_file.append(line)
+    pending_events.sort(key=itemgetter(0, 1))
 
     out_dir = os.path.dirname(os.path.abspath(output_path))
     if out_dir and not os.path.exists(out_dir):
         os.makedirs(out_dir, exist_ok=True)
 
-    ass_text = "\n".join(ass_file)
+    # Stream to the buffered file handle instead of joining the whole document
+    # into a second in-memory string: the (small) header is joined once, then
+    # each event line follows with its separator. No trailing newline, matching
+    # the previous join-based output.
     with open(output_path, "w", encoding="utf-8") as f:
-        f.write(ass_text)
+        f.write("\n".join(ass_file))
+        f.writelines("\n" + line for _start, _layer, line in pending_events)
 
     metadata = {
-        "start_seconds": earliest_start.total_seconds() if earliest_start is not None else None,
-        "end_seconds": latest_end.total_seconds() if latest_end is not None else None,
+        "start_seconds": earliest_start / 1000.0 if earliest_start is not None else None,
+        "end_seconds": latest_end / 1000.0 if latest_end is not None else None,
         "playres": (play_res_x, play_res_y),
     }
 
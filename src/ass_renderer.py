@@ -1,4 +1,5 @@
-from datetime import timedelta
+import functools
+import string
 
 from ass_format import format_time, split_ass_color
 
@@ -13,16 +14,35 @@ BG_PAD_X = 20
 WIDTH_SCALE = 1
 BG_CORNER_R = 18
 
+# ASCII width table so the per-character hot path of wrapping is a single
+# subscript instead of a branch chain; entries are filled lowest precedence
+# first so e.g. 'I' and '1' end up narrow and 'M'/'W' wide, matching the old
+# if/elif order. Non-ASCII falls back to the original classification.
+_CHAR_UNITS = [0.46] * 128
+for _ch in string.ascii_uppercase + string.digits:
+    _CHAR_UNITS[ord(_ch)] = 0.62
+for _ch in "MW@#%":
+    _CHAR_UNITS[ord(_ch)] = 0.85
+for _ch in "ilI1[]()":
+    _CHAR_UNITS[ord(_ch)] = 0.30
+for _ch in " .,:;!|'`":
+    _CHAR_UNITS[ord(_ch)] = 0.24
+del _ch
+
 def _char_width_units(ch: str) -> float:
-    if ch in " .,:;!|'`":
-        return 0.24
-    if ch in "ilI1[]()":
-        return 0.30
-    if ch in "MW@#%":
-        return 0.85
-    if ch.isupper() or ch.isdigit():
-        return 0.62
-    return 0.46
+    o = ord(ch)
+    if o < 128:
+        return _CHAR_UNITS[o]
+    return 0.62 if ch.isupper() or ch.isdigit() else 0.46
+
+_SPACE_UNITS = _CHAR_UNITS[ord(" ")]
+
+def _word_units(w: str) -> float:
+    # Encoding an ASCII word yields the table indices directly, so the sum runs
+    # over C iterators with no per-character Python call.
+    if w.isascii():
+        return sum(map(_CHAR_UNITS.__getitem__, w.encode("ascii")))
+    return sum(map(_char_width_units, w))
 
 def get_max_units_per_line(play_res_x: int, wrap_width_ratio: float) -> float:
     usable_px = max(1, play_res_x - MARGIN_L - MARGIN_R)
@@ -30,13 +50,17 @@ def get_max_units_per_line(play_res_x: int, wrap_width_ratio: float) -> float:
     return target_wrap_px / max(1, FONT_SIZE)
 
 def wrap_ass_text(text: str, max_units_per_line: float) -> tuple[str, int, float]:
-    # Normalize newlines to ASS breaks
-    raw = (text or "").replace("\r\n", "\n").replace("\r", "\n").replace("\n", "\\N")
+    # Normalize newlines to ASS breaks. Most messages contain no break at all;
+    # skip the replace passes and the split for those.
+    raw = text or ""
+    if "\r" in raw or "\n" in raw:
+        raw = raw.replace("\r\n", "\n").replace("\r", "\n").replace("\n", "\\N")
+    segments = raw.split("\\N") if "\\N" in raw else (raw,)
 
     out_lines: list[str] = []
     max_units_seen = 0.0
 
-    for seg in raw.split("\\N"):
+    for seg in segments:
         words = seg.split()
         if not words:
             out_lines.append("")
@@ -46,17 +70,16 @@ def wrap_ass_text(text: str, max_units_per_line: float) -> tuple[str, int, float
         current_units = 0.0
 
         for w in words:
-            w_units = sum(_char_width_units(ch) for ch in w)
-            space_units = _char_width_units(" ")
+            w_units = _word_units(w)
 
             if not current_words:
                 current_words = [w]
                 current_units = w_units
                 continue
 
-            if current_units + space_units + w_units <= max_units_per_line:
+            if current_units + _SPACE_UNITS + w_units <= max_units_per_line:
                 current_words.append(w)
-                current_units += space_units + w_units
+                current_units += _SPACE_UNITS + w_units
             else:
                 out_lines.append(" ".join(current_words))
                 max_units_seen = max(max_units_seen, current_units)
@@ -112,6 +135,7 @@ def get_bg_box_x(alignment: int, text_w: int, play_res_x: int) -> tuple[int, int
     box_left = max(0, min(int(box_left), play_res_x - box_width))
     return int(box_left), box_width
 
+@functools.lru_cache(maxsize=256)
 def _rounded_rect_path(width: int, height: int, r: int) -> str:
     r = max(0, min(int(r), int(width // 2), int(height // 2)))
     if r <= 0:
@@ -136,11 +160,11 @@ def create_bg_event(
     sr: dict[str, object],
     line_count: int,
     max_line_units: float,
-    start: timedelta,
-    end: timedelta,
+    start_ms: int,
+    end_ms: int,
     play_res_x: int,
     play_res_y: int,
-) -> tuple[timedelta, int, str] | None:
+) -> tuple[int, int, str] | None:
     if not sr.get("has_bg"):
         return None
 
@@ -165,5 +189,5 @@ def create_bg_event(
         f"{{\\p0}}"
     )
 
-    bg_line = f"Dialogue: 0,{format_time(start)},{format_time(end)},Default,,0,0,0,,{bg_text}"
-    return (start, -1, bg_line)
+    bg_line = f"Dialogue: 0,{format_time(start_ms)},{format_time(end_ms)},Default,,0,0,0,,{bg_text}"
+    return (start_ms, -1, bg_line)
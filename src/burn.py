@@ -1,14 +1,53 @@
+import functools
+import json
+import os
+import shlex
 import shutil
 import subprocess
 import sys
 import hashlib
 import tempfile
 import time
-import signal
 from pathlib import Path
 from typing import Optional
 
-from ass_generator import generate_ass
+# Generated ASS files are cached content-addressed by INI hash so repeated
+# burns of the same INI (e.g. while iterating encoding settings) skip the
+# whole generate step. Bounded by an LRU sweep on mtime.
+_CACHE_MAX_ENTRIES = 32
+
+# Versioned so entries hashed under an older scheme are simply never hit.
+def _cache_dir() -> Path:
+    d = Path(tempfile.gettempdir()) / "atc-subs-cache-v2"
+    d.mkdir(exist_ok=True)
+    return d
+
+def _hash_file(path: Path) -> str:
+    """Content hash of a file, streamed in chunks rather than read whole."""
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+
+def _prune_cache(cache_dir: Path) -> None:
+    """Drop all but the most recently used cache entries."""
+    try:
+        entries = sorted(cache_dir.glob("*.ass"), key=lambda p: p.stat().st_mtime, reverse=True)
+    except OSError:
+        return
+    for stale in entries[_CACHE_MAX_ENTRIES:]:
+        for p in (stale, stale.with_suffix(".meta.json")):
+            try:
+                p.unlink()
+            except OSError:
+                pass
+    try:
+        probes = sorted(cache_dir.glob("*.probe.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    except OSError:
+        return
+    for stale in probes[_CACHE_MAX_ENTRIES:]:
+        try:
+            stale.unlink()
+        except OSError:
+            pass
 
 def _ffmpeg_available() -> bool:
     return shutil.which("ffmpeg") is not None
@@ -16,27 +55,24 @@ def _ffmpeg_available() -> bool:
 def _ffprobe_available() -> bool:
     return shutil.which("ffprobe") is not None
 
-def _get_video_fps_duration(video_path: Path):
-    """
-    Return (fps, duration_seconds) for the given video file using ffprobe.
-    Returns (None, None) on failure.
-    """
-    if not _ffprobe_available():
-        return None, None
+def _probe_video(video_path: Path):
+    """Run ffprobe once for (fps, duration_seconds); (None, None) on failure."""
     try:
-        # get duration
+        # One process gives both the container duration and the stream's
+        # avg_frame_rate; process startup dominates, so don't spawn twice.
         res = subprocess.run(
-            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", str(video_path)],
+            [
+                "ffprobe", "-v", "error", "-select_streams", "v:0",
+                "-show_entries", "format=duration:stream=avg_frame_rate",
+                "-of", "json", str(video_path),
+            ],
             check=True, capture_output=True, text=True
         )
-        duration_str = res.stdout.strip().splitlines()[0] if res.stdout.strip() else ""
+        probed = json.loads(res.stdout)
+        duration_str = (probed.get("format") or {}).get("duration") or ""
         duration = float(duration_str) if duration_str else None
-        # get avg_frame_rate
-        res2 = subprocess.run(
-            ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=avg_frame_rate", "-of", "default=noprint_wrappers=1:nokey=1", str(video_path)],
-            check=True, capture_output=True, text=True
-        )
-        fr_str = res2.stdout.strip().splitlines()[0] if res2.stdout.strip() else ""
+        streams = probed.get("streams") or []
+        fr_str = (streams[0].get("avg_frame_rate") if streams else "") or ""
         if fr_str and "/" in fr_str:
             num, den = fr_str.split("/")
             fps = float(num) / float(den) if float(den) != 0 else None
@@ -46,12 +82,69 @@ def _get_video_fps_duration(video_path: Path):
     except Exception:
         return None, None
 
-def _run_ffmpeg_with_progress(cmd, total_frames, progress=True):
+@functools.lru_cache(maxsize=64)
+def _probe_cached(path_str: str, mtime_ns: int, size: int):
+    # The (path, mtime, size) triple keys both the in-process memo and a
+    # cross-process sidecar in the cache dir, so repeated burns of the same
+    # video skip the two ffprobe launches.
+    key = hashlib.blake2b(f"{path_str}:{mtime_ns}:{size}".encode(), digest_size=16).hexdigest()
+    probe_path = _cache_dir() / f"{key}.probe.json"
+    if probe_path.exists():
+        try:
+            data = json.loads(probe_path.read_text(encoding="utf-8"))
+            return data.get("fps"), data.get("duration")
+        except Exception:
+            pass
+    fps, duration = _probe_video(Path(path_str))
+    if fps is not None or duration is not None:
+        try:
+            probe_path.write_text(json.dumps({"fps": fps, "duration": duration}), encoding="utf-8")
+        except Exception:
+            pass
+    return fps, duration
+
+def _get_video_fps_duration(video_path: Path):
+    """
+    Return (fps, duration_seconds) for the given video file using ffprobe.
+    Returns (None, None) on failure. Results are memoized per (path, mtime, size).
+    """
+    if not _ffprobe_available():
+        return None, None
+    try:
+        st = video_path.stat()
+    except OSError:
+        return None, None
+    return _probe_cached(str(video_path), st.st_mtime_ns, st.st_size)
+
+# How long to let ffmpeg flush after a Ctrl+C before escalating.
+_SIGINT_WAIT_SECS = 3
+
+def _reap_interrupted(proc) -> None:
     """
-    Run ffmpeg command. If progress is True and total_frames is provided, run ffmpeg
-    with -progress pipe and display a nicer terminal progress UI. Handles Ctrl+C
-    (SIGINT) gracefully by terminating ffmpeg and exiting with code 130.
-    Falls back to normal ffmpeg invocation when progress is disabled or total_frames is unknown.
+    Handle Ctrl+C: ffmpeg shares our foreground process group, so the terminal
+    already delivered SIGINT to it too. Give it a moment to flush and finalize
+    the output file, then escalate (terminate, then kill) only if it hangs.
+    """
+    try:
+        proc.wait(timeout=_SIGINT_WAIT_SECS)
+    except subprocess.TimeoutExpired:
+        proc.terminate()
+        try:
+            proc.wait(timeout=_SIGINT_WAIT_SECS)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    print("\nTerminated by user.", file=sys.stderr)
+    sys.exit(130)
+
+def _run_ffmpeg_with_progress(cmd, total_us, progress=True):
+    """
+    Run ffmpeg command. If progress is True and total_us (expected output
+    duration in microseconds) is provided, run ffmpeg with -progress pipe and
+    display a nicer terminal progress UI tracked against the output timestamp
+    (out_time_us), so no frame count — and hence no frame-rate probe — is
+    needed. Handles Ctrl+C (SIGINT) gracefully by waiting for ffmpeg to stop
+    and exiting with code 130. Falls back to normal ffmpeg invocation when
+    progress is disabled or total_us is unknown.
     """
     def _format_time(s: float) -> str:
         if s is None or s != s or s == float("inf"):
@@ -62,114 +155,103 @@ def _run_ffmpeg_with_progress(cmd, total_frames, progress=True):
         sec = s % 60
         return f"{h:d}:{m:02d}:{sec:02d}"
 
-    # If no progress UI, run ffmpeg normally but still handle Ctrl+C to terminate child.
-    if not progress or not total_frames:
-        proc = None
+    # If no progress UI, run ffmpeg normally; Ctrl+C is handled on wait().
+    if not progress or not total_us:
         try:
             proc = subprocess.Popen(cmd)
-            def _handler(signum, frame):
-                try:
-                    if proc and proc.poll() is None:
-                        proc.terminate()
-                except Exception:
-                    pass
-                print("\nTerminated by user.", file=sys.stderr)
-                sys.exit(130)
-            prev = signal.getsignal(signal.SIGINT)
-            signal.signal(signal.SIGINT, _handler)
-            proc.wait()
-            signal.signal(signal.SIGINT, prev)
-            if proc.returncode != 0:
-                print("ffmpeg failed with exit code", proc.returncode, file=sys.stderr)
-                sys.exit(proc.returncode)
-        except KeyboardInterrupt:
-            try:
-                if proc and proc.poll() is None:
-                    proc.terminate()
-            except Exception:
-                pass
-            print("\nTerminated by user.", file=sys.stderr)
-            sys.exit(130)
         except Exception as e:
             print("ffmpeg failed:", e, file=sys.stderr)
             sys.exit(1)
+        try:
+            proc.wait()
+        except KeyboardInterrupt:
+            _reap_interrupted(proc)
+        if proc.returncode != 0:
+            print("ffmpeg failed with exit code", proc.returncode, file=sys.stderr)
+            sys.exit(proc.returncode)
         return
 
     # Progress UI mode: spawn ffmpeg with -progress pipe and render a nicer line with ETA/fps.
-    cmd_progress = cmd[:1] + ["-hide_banner", "-loglevel", "error"] + cmd[1:] + ["-progress", "pipe:1"]
-    proc = None
-    prev = None
+    # -stats_period bounds how often ffmpeg emits progress keys, keeping pipe
+    # traffic and parent wake-ups low on fast codecs.
+    cmd_progress = cmd[:1] + ["-hide_banner", "-loglevel", "error", "-stats_period", "0.5"] + cmd[1:] + ["-progress", "pipe:1"]
+    try:
+        # Binary pipe: ffmpeg emits many progress fields per second and only
+        # frame=/progress= matter, so skip the text-mode decoding entirely.
+        proc = subprocess.Popen(cmd_progress, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except Exception as e:
+        print("ffmpeg failed:", e, file=sys.stderr)
+        sys.exit(1)
     try:
-        proc = subprocess.Popen(cmd_progress, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1)
-        def _sigint_handler(signum, frame):
-            try:
-                if proc and proc.poll() is None:
-                    proc.terminate()
-            except Exception:
-                pass
-            print("\nTerminated by user.", file=sys.stderr)
-            sys.exit(130)
-        prev = signal.getsignal(signal.SIGINT)
-        signal.signal(signal.SIGINT, _sigint_handler)
-
         start_time = time.time()
-        current_frame = 0
+        current_us = 0
         bar_len = 30
         last_render = ""
+        last_render_ts = 0.0
+        total_s = total_us / 1e6
         for line in proc.stdout:
             line = line.strip()
-            if line.startswith("frame="):
+            if line.startswith(b"out_time_us="):
                 try:
-                    current_frame = int(line.split("=", 1)[1])
-                except Exception:
+                    current_us = int(line[12:])
+                except ValueError:
+                    # ffmpeg emits "N/A" before the first timestamp is known.
+                    continue
+                # Fast codecs emit progress blocks often; cap the terminal
+                # rendering at ~10 Hz (the final timestamp always shows).
+                now = time.monotonic()
+                if now - last_render_ts < 0.1 and current_us < total_us:
                     continue
-                pct = min(max(current_frame / total_frames, 0.0), 1.0)
+                last_render_ts = now
+                pct = min(max(current_us / total_us, 0.0), 1.0)
                 filled = int(round(pct * bar_len))
                 empty = bar_len - filled
                 bar = "█" * filled + "─" * empty
                 elapsed = time.time() - start_time
-                fps_curr = (current_frame / elapsed) if elapsed > 0 else 0.0
-                remaining_frames = max(total_frames - current_frame, 0)
-                eta = (remaining_frames / fps_curr) if fps_curr > 0 else float("inf")
+                speed = (current_us / 1e6 / elapsed) if elapsed > 0 else 0.0
+                remaining_s = max(total_s - current_us / 1e6, 0.0)
+                eta = (remaining_s / speed) if speed > 0 else float("inf")
                 left = _format_time(elapsed)
                 eta_s = _format_time(eta)
                 percent_display = pct * 100
-                render = f"\r[{bar}] {percent_display:6.2f}%  {current_frame}/{total_frames}  {fps_curr:5.1f} fps  elapsed {left}  eta {eta_s}"
+                render = f"\r[{bar}] {percent_display:6.2f}%  {_format_time(current_us / 1e6)}/{_format_time(total_s)}  {speed:5.2f}x  elapsed {left}  eta {eta_s}"
                 if render != last_render:
                     sys.stdout.write(render)
                     sys.stdout.flush()
                     last_render = render
-            elif line.startswith("progress=") and line.split("=", 1)[1] == "end":
+            elif line == b"progress=end":
                 break
         proc.wait()
         # ensure final 100% render
         elapsed = time.time() - start_time
         left = _format_time(elapsed)
         final_bar = "█" * bar_len
-        sys.stdout.write(f"\r[{final_bar}] {100.00:6.2f}%  {total_frames}/{total_frames}  { (total_frames/elapsed) if elapsed>0 else 0.0:5.1f} fps  elapsed {left}  eta 0:00:00\n")
+        final_speed = (total_s / elapsed) if elapsed > 0 else 0.0
+        sys.stdout.write(f"\r[{final_bar}] {100.00:6.2f}%  {_format_time(total_s)}/{_format_time(total_s)}  {final_speed:5.2f}x  elapsed {left}  eta 0:00:00\n")
         sys.stdout.flush()
         if proc.returncode != 0:
             print("ffmpeg failed with exit code", proc.returncode, file=sys.stderr)
             sys.exit(proc.returncode)
     except KeyboardInterrupt:
-        try:
-            if proc and proc.poll() is None:
-                proc.terminate()
-        except Exception:
-            pass
-        print("\nTerminated by user.", file=sys.stderr)
-        sys.exit(130)
+        _reap_interrupted(proc)
     except Exception as e:
         print("ffmpeg failed:", e, file=sys.stderr)
         sys.exit(1)
-    finally:
-        try:
-            if prev is not None:
-                signal.signal(signal.SIGINT, prev)
-        except Exception:
-            pass
 
-def burn_from_ini(mode: str, ini_path: Path, video_path: Optional[Path], output_path: Path, progress: bool = True) -> None:
+def _run_and_report(cmd, total_us, progress, wrote_label, out_path) -> None:
+    # shlex.join quotes paths with spaces, so the displayed command can be
+    # copy-pasted and re-run as-is.
+    print("Running:", shlex.join(cmd))
+    _run_ffmpeg_with_progress(cmd, total_us, progress)
+    print(wrote_label, out_path)
+
+def burn_from_ini(
+    mode: str,
+    ini_path: Path,
+    video_path: Optional[Path],
+    output_path: Path,
+    progress: bool = True,
+) -> None:
     if not _ffmpeg_available():
         print("ffmpeg is not available on PATH.", file=sys.stderr)
         sys.exit(1)
@@ -178,18 +260,49 @@ def burn_from_ini(mode: str, ini_path: Path, video_path: Optional[Path], output_
         print(f"INI file not found: {ini_path}", file=sys.stderr)
         sys.exit(1)
 
-    # generate ASS file to temporary {sha1}.ass
-    ini_bytes = ini_path.read_bytes()
-    hash_name = hashlib.sha1(ini_bytes).hexdigest()
-    tmp_path = Path(tempfile.gettempdir()) / f"{hash_name}.ass"
-    try:
-        metadata = generate_ass(str(ini_path), str(tmp_path))
-    except Exception as e:
-        print("Failed to generate ASS file:", e, file=sys.stderr)
-        sys.exit(1)
-    # metadata returned by generate_ass contains "start","end","playres"; ASS is written to tmp_path
+    # Generate (or reuse) the ASS file for this INI content, keyed {hash}.ass
+    # with the generator metadata persisted alongside as {hash}.meta.json.
+    # BLAKE2b-128 is faster than SHA-1 and plenty for a content-address key.
+    hash_name = _hash_file(ini_path)
+    cache_dir = _cache_dir()
+    tmp_path = cache_dir / f"{hash_name}.ass"
+    meta_path = cache_dir / f"{hash_name}.meta.json"
+
+    metadata = None
+    if tmp_path.exists() and tmp_path.stat().st_size > 0 and meta_path.exists():
+        try:
+            metadata = json.loads(meta_path.read_text(encoding="utf-8"))
+            metadata["playres"] = tuple(metadata.get("playres") or (1920, 1080))
+            # Refresh mtimes so the LRU sweep keeps warm entries.
+            now = time.time()
+            os.utime(tmp_path, (now, now))
+            os.utime(meta_path, (now, now))
+        except Exception:
+            metadata = None
+
+    if metadata is None:
+        # Deferred: on a cache hit the whole ASS layout machinery never loads.
+        from ass_generator import generate_ass
+
+        try:
+            metadata = generate_ass(str(ini_path), str(tmp_path))
+        except Exception as e:
+            print("Failed to generate ASS file:", e, file=sys.stderr)
+            sys.exit(1)
+        try:
+            meta_path.write_text(json.dumps(metadata), encoding="utf-8")
+        except Exception:
+            pass
+        _prune_cache(cache_dir)
+    # metadata contains "start_seconds"/"end_seconds"/"playres"; ASS is at tmp_path
 
     mode = mode.lower()
+
+    # Every mode feeds the same cached ASS file to the subtitles filter;
+    # escape the path once instead of per branch.
+    escaped = tmp_path.as_posix().replace(":", r"\:").replace("'", r"\'")
+    vf_subs = f"subtitles=filename='{escaped}'"
+
     # Ensure output filename has an appropriate extension depending on mode.
     out_path = output_path
     if out_path.suffix == "":
@@ -202,33 +315,26 @@ def burn_from_ini(mode: str, ini_path: Path, video_path: Optional[Path], output_
         if video_path is None or not video_path.exists():
             print("Video input is required for default mode (--video / -v).", file=sys.stderr)
             sys.exit(1)
-        # use temporary ASS file written by generate_ass
-        escaped = str(tmp_path.as_posix()).replace(":", r"\:").replace("'", r"\'")
-        vf = f"subtitles=filename='{escaped}'"
         cmd = [
             "ffmpeg",
             "-y",
             "-i",
             str(video_path),
             "-vf",
-            vf,
+            vf_subs,
             "-c:a",
             "copy",
             str(out_path),
         ]
-        print("Running:", " ".join(cmd))
-        # compute total_frames for progress if possible
-        total_frames = None
+        # compute expected output duration for progress if possible
+        total_us = None
         if progress:
-            fps, duration = _get_video_fps_duration(video_path)
-            if fps is not None and duration is not None:
-                total_frames = int(round(fps * duration))
-        _run_ffmpeg_with_progress(cmd, total_frames, progress)
-        try:
-            tmp_path.unlink()
-        except Exception:
-            pass
-        print("Wrote:", out_path)
+            # Progress tracks the output timestamp, so only the container
+            # duration is needed — the frame rate is never probed.
+            _, duration = _get_video_fps_duration(video_path)
+            if duration is not None:
+                total_us = int(round(duration * 1e6))
+        _run_and_report(cmd, total_us, progress, "Wrote:", out_path)
     elif mode == "trim":
         if video_path is None or not video_path.exists():
             print("Video input is required for trim mode (--video / -v).", file=sys.stderr)
@@ -238,9 +344,6 @@ def burn_from_ini(mode: str, ini_path: Path, video_path: Optional[Path], output_
         if start is None or end is None:
             print("Could not determine start/end from generated ASS; generator must provide metadata.", file=sys.stderr)
             sys.exit(1)
-        # use temporary ASS file written by generate_ass
-        escaped = str(tmp_path.as_posix()).replace(":", r"\:").replace("'", r"\'")
-        vf = f"subtitles=filename='{escaped}'"
         cmd = [
             "ffmpeg",
             "-y",
@@ -251,24 +354,15 @@ def burn_from_ini(mode: str, ini_path: Path, video_path: Optional[Path], output_
             "-to",
             str(end),
             "-vf",
-            vf,
+            vf_subs,
             "-c:a",
             "copy",
             str(out_path),
         ]
-        print("Running:", " ".join(cmd))
-        total_frames = None
-        if progress:
-            duration_trim = float(end) - float(start)
-            fps, _ = _get_video_fps_duration(video_path)
-            if fps is not None and duration_trim is not None:
-                total_frames = int(round(fps * duration_trim))
-        _run_ffmpeg_with_progress(cmd, total_frames, progress)
-        try:
-            tmp_path.unlink()
-        except Exception:
-            pass
-        print("Wrote:", out_path)
+        # Trim already knows its duration from the ASS metadata, so no
+        # ffprobe launch is needed at all.
+        total_us = int(round((float(end) - float(start)) * 1e6)) if progress else None
+        _run_and_report(cmd, total_us, progress, "Wrote:", out_path)
     elif mode == "transparent":
         # Render subtitles on transparent background (no source video)
         end = metadata.get("end_seconds") if metadata and metadata.get("end_seconds") is not None else None
@@ -280,9 +374,7 @@ def burn_from_ini(mode: str, ini_path: Path, video_path: Optional[Path], output_
         # default framerate
         r = 30
         color_input = f"color=c=black@0:s={w}x{h}:r={r}:d={duration}"
-        # use temporary ASS file written by generate_ass
-        escaped = str(tmp_path.as_posix()).replace(":", r"\:").replace("'", r"\'")
-        vf = f"format=yuva420p,subtitles=filename='{escaped}'"
+        vf = f"format=yuva420p,{vf_subs}"
         cmd = [
             "ffmpeg",
             "-y",
@@ -302,18 +394,20 @@ def burn_from_ini(mode: str, ini_path: Path, video_path: Optional[Path], output_
             "realtime",
             "-cpu-used",
             "8",
+            # libvpx-vp9 is single-threaded by default; row multithreading
+            # plus tile columns lets the encode scale across cores.
+            "-row-mt",
+            "1",
+            "-tile-columns",
+            "2",
+            "-threads",
+            str(min(8, os.cpu_count() or 4)),
             "-pix_fmt",
             "yuva420p",
             str(out_path),
         ]
-        print("Running:", " ".join(cmd))
-        total_frames = int(round(duration * r)) if (duration is not None) else None
-        _run_ffmpeg_with_progress(cmd, total_frames, progress)
-        try:
-            tmp_path.unlink()
-        except Exception:
-            pass
-        print("Wrote transparent overlay:", out_path)
+        total_us = int(round(duration * 1e6)) if (duration is not None) else None
+        _run_and_report(cmd, total_us, progress, "Wrote transparent overlay:", out_path)
     else:
         print("Unknown burn mode: " + mode, file=sys.stderr)
         sys.exit(1)
@@ -1,16 +1,26 @@
+import functools
 from collections.abc import Mapping
 
+_TRUE_WORDS = frozenset(("1", "true", "yes", "on"))
+_FALSE_WORDS = frozenset(("0", "false", "no", "off"))
+
+@functools.lru_cache(maxsize=256)
+def _parse_bool_str(s: str) -> bool | None:
+    # INI attribute values recur constantly ("true", "false", "1", ...);
+    # memoizing skips the strip/lower on every repeat.
+    s = s.strip().lower()
+    if s in _TRUE_WORDS:
+        return True
+    if s in _FALSE_WORDS:
+        return False
+    return None
+
 def parse_bool(value: object) -> bool | None:
     """
     Parse common INI booleans.
     Returns True/False when value is recognized, else None.
     """
-    s = str(value or "").strip().lower()
-    if s in ("1", "true", "yes", "on"):
-        return True
-    if s in ("0", "false", "no", "off"):
-        return False
-    return None
+    return _parse_bool_str(value if isinstance(value, str) else str(value or ""))
 
 def pick_str(*values: object, default: str) -> str:
     """Return the first non-empty string among values, else default."""
@@ -52,6 +62,22 @@ def _type_info_for_speaker_info(
         return {}
     return types.get(stype, {})
 
+def resolve_speaker_scope(
+    speaker_key: str,
+    *,
+    speakers: Mapping[str, Mapping[str, str]],
+    types: Mapping[str, Mapping[str, str]],
+    meta: Mapping[str, Mapping[str, str]] | None = None,
+) -> tuple[Mapping[str, str], Mapping[str, str]]:
+    """
+    Resolve the (speaker_info, type_info) pair for a key once, so callers
+    fetching several attributes can walk the speaker->type chain a single
+    time and pick each attribute with pick_str/pick_bool/pick_int directly.
+    """
+    speaker_info = _speaker_info_for_key(speaker_key, speakers, meta)
+    type_info = _type_info_for_speaker_info(speaker_info, types)
+    return speaker_info, type_info
+
 def get_effective_speaker_str(
     speaker_key: str,
     attr: str,
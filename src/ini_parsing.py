@@ -1,137 +1,72 @@
-import configparser
+import re
 
-def parse_comms_lines(path: str | None = None, lines: list[str] | None = None) -> list[tuple[str, str]]:
-    """
-    Parse the [comms] section preserving repeated keys and original order.
+_COMMENT_STARTS = frozenset(";#")
 
-    Returns: list[tuple[str, str]] of (KEY, VALUE) where KEY is uppercased.
-    """
-    lines_out = []
-    in_comms = False
-    iterator = lines if lines is not None else open(path, "r", encoding="utf-8")
-    try:
-        for raw in iterator:
-            line = raw.strip()
-            if not line or line.startswith(";") or line.startswith("#"):
-                continue
-            if line.startswith("[") and line.endswith("]"):
-                in_comms = (line[1:-1].strip().lower() == "comms")
-                continue
-            if not in_comms:
-                continue
-            if "=" not in line:
-                continue
-            k, v = line.split("=", 1)
-            k = k.strip().upper()
-            v = v.strip()
-            # If the value is wrapped in quotes (to allow apostrophes), remove the outer quotes.
-            if len(v) >= 2 and ((v[0] == '"' and v[-1] == '"') or (v[0] == "'" and v[-1] == "'")):
-                v = v[1:-1]
-            # Unescape any escaped quotes inside the value.
-            v = v.replace('\\"', '"').replace("\\'", "'")
-            lines_out.append((k, v))
-    finally:
-        if lines is None:
-            iterator.close()
+# Section headers and key=value lines, matched over the whole file text in one
+# C-level scan instead of per-line strip/startswith chains.
+_SECTION_RE = re.compile(r"^[ \t]*\[([^\]]+)\][ \t]*$", re.MULTILINE)
+_KV_RE = re.compile(r"^[ \t]*([^;#=\s][^=\n]*?)[ \t]*=[ \t]*(.*?)[ \t]*$", re.MULTILINE)
 
-    return lines_out
+# Waypoint tokens are whitespace-free words separated by commas and/or spaces;
+# one findall replaces the split/strip/filter/add loop.
+_WAYPOINT_TOKEN = re.compile(r"[^,\s]+")
 
-def strip_outer_quotes(s: str) -> str:
-    """Remove surrounding quotes if present and unescape internal escaped quotes."""
-    if not s:
-        return s
-    s = s.strip()
-    if len(s) >= 2 and ((s[0] == '"' and s[-1] == '"') or (s[0] == "'" and s[-1] == "'")):
-        s = s[1:-1]
-    return s.replace('\\"', '"').replace("\\'", "'")
+def _unquote_comms_value(v: str) -> str:
+    # If the value is wrapped in quotes (to allow apostrophes), remove the outer quotes.
+    if len(v) >= 2 and ((v[0] == '"' and v[-1] == '"') or (v[0] == "'" and v[-1] == "'")):
+        v = v[1:-1]
+    # Unescape any escaped quotes inside the value.
+    return v.replace('\\"', '"').replace("\\'", "'")
 
-def parse_ini_non_comms(path: str | None = None, lines: list[str] | None = None) -> configparser.ConfigParser:
+def parse_ini_all(text: str) -> tuple[dict[str, dict[str, str]], list[tuple[str, str]], dict[str, set[str]]]:
     """
-    Parse everything except [comms].
+    Parse the whole INI in a single pass over the file text, splitting it into
+    section spans and dispatching each span to the right collector:
 
-    We can't directly use ConfigParser on the whole file because [comms]
-    contains repeated keys (APP=..., APP=...) which triggers DuplicateOptionError
-    when strict=True. So we manually strip out the [comms] section first.
+    - sections: everything except [comms] and [waypoints.*], as
+      {section: {key: value}} with keys lowercased (matching the old
+      ConfigParser behavior; these sections never repeat keys, unlike [comms]
+      whose repeated entries must be preserved in order)
+    - comms: [comms] entries as (KEY, VALUE) with KEY uppercased, order preserved
+    - waypoints: {"RNAV": {"LAZET", ...}} from [waypoints.*] sections
 
-    Also exclude any [waypoints.*] sections from the ConfigParser input since
-    they contain freeform tokens (one per line) rather than key=value pairs.
+    Returns (sections, comms, waypoints).
     """
-    kept_lines = []
-    in_comms = False
-    iterator = lines if lines is not None else open(path, "r", encoding="utf-8")
-    try:
-        for raw in iterator:
-            line = raw.strip()
-            if line.startswith("[") and line.endswith("]"):
-                section = line[1:-1].strip().lower()
-                # Exclude both [comms] and [waypoints.*] from the ConfigParser input
-                in_comms = (section == "comms" or section.startswith("waypoints."))
-                if not in_comms:
-                    kept_lines.append(raw)
-                continue
+    sections: dict[str, dict[str, str]] = {}
+    comms: list[tuple[str, str]] = []
+    waypoints: dict[str, set[str]] = {}
 
-            if in_comms:
-                continue
+    headers = list(_SECTION_RE.finditer(text))
 
-            kept_lines.append(raw)
-    finally:
-        if lines is None:
-            iterator.close()
+    for n, m in enumerate(headers):
+        span_end = headers[n + 1].start() if n + 1 < len(headers) else len(text)
+        section = m.group(1).strip()
+        section_lower = section.lower()
 
-    config = configparser.ConfigParser()
-    config.read_string("".join(kept_lines))
-    return config
+        if section_lower == "comms":
+            for kv in _KV_RE.finditer(text, m.end(), span_end):
+                comms.append((kv.group(1).upper(), _unquote_comms_value(kv.group(2))))
+        elif section_lower.startswith("waypoints."):
+            name = section.split(".", 1)[1].strip().upper()
+            tokens = waypoints[name] = set()
+            if name:
+                for line in text[m.end():span_end].splitlines():
+                    line = line.strip()
+                    if not line or line[0] in _COMMENT_STARTS:
+                        continue
+                    tokens.update(_WAYPOINT_TOKEN.findall(line))
+        else:
+            items = sections.setdefault(section, {})
+            for kv in _KV_RE.finditer(text, m.end(), span_end):
+                items[kv.group(1).lower()] = kv.group(2)
 
-def load_acronyms(config: configparser.ConfigParser) -> dict[str, str]:
-    """
-    Load [acronyms.*] sections.
-
-    Example:
-      [acronyms.FL]
-      extension = Flight Level
+    return sections, comms, waypoints
 
-    Returns: {"FL": "Flight Level", ...} with keys uppercased.
-    """
-    acr = {}
-    for s in config.sections():
-        if not s.startswith("acronyms."):
-            continue
-        key = s.split(".", 1)[1].strip().upper()
-        ext = config.get(s, "extension", fallback="").strip()
-        if key and ext:
-            acr[key] = ext
-    return acr
-
-def load_waypoints(path: str | None = None, lines: list[str] | None = None) -> dict[str, set[str]]:
-    """
-    Load [waypoints.*] sections where each non-empty non-comment line is a waypoint token.
-    Returns e.g. {"RNAV": {"LAZET", "RULOX"}} with tokens preserved as written.
-    """
-    waypoints = {}
-    in_section = False
-    current = None
-    iterator = lines if lines is not None else open(path, "r", encoding="utf-8")
-    try:
-        for raw in iterator:
-            line = raw.strip()
-            if not line or line.startswith(";") or line.startswith("#"):
-                continue
-            if line.startswith("[") and line.endswith("]"):
-                sec = line[1:-1].strip()
-                if sec.lower().startswith("waypoints."):
-                    in_section = True
-                    current = sec.split(".", 1)[1].strip().upper()
-                    waypoints[current] = set()
-                else:
-                    in_section = False
-                    current = None
-                continue
-            if in_section and current:
-                parts = [p.strip() for p in line.split(",") if p.strip()]
-                for p in parts:
-                    waypoints[current].add(p)
-    finally:
-        if lines is None:
-            iterator.close()
-
-    return waypoints
+def strip_outer_quotes(s: str) -> str:
+    """Remove surrounding quotes if present and unescape internal escaped quotes."""
+    if not s:
+        return s
+    s = s.strip()
+    if len(s) >= 2 and ((s[0] == '"' and s[-1] == '"') or (s[0] == "'" and s[-1] == "'")):
+        s = s[1:-1]
+    return s.replace('\\"', '"').replace("\\'", "'")
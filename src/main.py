@@ -1,10 +1,6 @@
 import argparse
 from pathlib import Path
 
-from ass_generator import generate_ass
-from init_template import init_template
-from burn import burn_from_ini
-
 def main() -> None:
     parser = argparse.ArgumentParser(description="Compile comms INI to ASS, initialize template INI, or burn subtitles using ffmpeg (streams ASS).")
     parser.set_defaults(command="compile")
@@ -37,9 +33,15 @@ def main() -> None:
         if not hasattr(args, "output"):
             args.output = "../comms.ass"
 
+    # Each subcommand imports its module only when invoked, so e.g. `init`
+    # never loads the ASS generator and `--help` loads none of them.
     if args.command == "init":
+        from init_template import init_template
+
         init_template(args.name)
     elif args.command == "burn":
+        from burn import burn_from_ini
+
         ini_path = Path(args.input)
         video_path = Path(args.video) if args.video else None
         out_path = Path(args.output)
@@ -47,6 +49,8 @@ def main() -> None:
         burn_from_ini(args.mode, ini_path, video_path, out_path, progress)
     else:
         # compile (default)
+        from ass_generator import generate_ass
+
         generate_ass(args.input, args.output)
 
 if __name__ == "__main__":
@@ -1,5 +1,27 @@
+import re
+import string
 from datetime import timedelta
 
+# ATC comms are ASCII in practice; precomputed sets avoid the per-character
+# Unicode-category method calls (ch.isupper()/ch.isdigit()/...) in the hot loops.
+_DIGITS = frozenset(string.digits)
+_UPPERS = frozenset(string.ascii_uppercase)
+
+# Punctuation stripped from token edges for classification. Note it still
+# counts toward the base character total, so tokens can't be pre-stripped at
+# tokenization time without changing estimates.
+_EDGE_PUNCT = ".,!?;:()[]{}\"'"
+_EDGE_PUNCT_SET = frozenset(_EDGE_PUNCT)
+
+# Leading run of uppercase ASCII letters — the only candidate an acronym
+# match can ever be, since a shorter prefix would leave an uppercase letter
+# right after it.
+_UPPER_RUN_RE = re.compile(r"[A-Z]+")
+
+# Deletes lowercase letters and spaces; text that vanishes under this table
+# triggers none of the acronym/NATO/digit logic and counts byte-for-byte.
+_LOWER_SPACE_DEL = str.maketrans("", "", string.ascii_lowercase + " ")
+
 _DIGIT_WORD_LEN = {
     "0": 4,  # zero
     "1": 3,  # one
@@ -43,6 +65,26 @@ _NATO_LEN = {
     "Z": 4,  # zulu
 }
 
+# Combined per-character spoken lengths, built once so the hot loops do a
+# single table lookup per character:
+# - _CAPS_SPOKEN_LEN: all-caps tokens (digit words + NATO names, incl. the
+#   trailing space each expansion adds)
+# - _NORMAL_SPOKEN_LEN: normal tokens (digits spoken as words, everything else 1)
+_CAPS_SPOKEN_LEN = {ch: length + 1 for ch, length in _DIGIT_WORD_LEN.items()}
+_CAPS_SPOKEN_LEN.update({ch: length + 1 for ch, length in _NATO_LEN.items()})
+_NORMAL_SPOKEN_LEN = dict(_DIGIT_WORD_LEN)
+
+# Byte-indexed variants of the same tables: encoding an ASCII token yields the
+# table indices directly, so a token's length sums over C iterators with no
+# per-character hashing (same trick as the width table in ass_renderer).
+_CAPS_LUT = [0] * 128
+for _ch, _len in _CAPS_SPOKEN_LEN.items():
+    _CAPS_LUT[ord(_ch)] = _len
+_NORMAL_LUT = [1] * 128
+for _ch, _len in _DIGIT_WORD_LEN.items():
+    _NORMAL_LUT[ord(_ch)] = _len
+del _ch, _len
+
 def estimate_spoken_length(
     text: str,
     acronyms: dict[str, str] | None = None,
@@ -60,78 +102,98 @@ def estimate_spoken_length(
     This is a heuristic used for duration estimation (cps).
 
     The `waypoints` set (uppercase tokens) disables NATO expansion for matching tokens so
-    RNAV waypoints are spoken literally.
+    RNAV waypoints are spoken literally. Pass a frozenset of already-uppercased
+    tokens to skip the per-call normalization.
     """
+    # Fast path: plain lowercase words ("cleared to land", acronym expansions
+    # like "flight level") need no classification at all — each token counts
+    # its characters plus a space boundary.
+    if not text.translate(_LOWER_SPACE_DEL):
+        tokens = text.split()
+        return sum(map(len, tokens)) + len(tokens)
+
     acronyms = acronyms or {}
-    waypoints = set(w.upper() for w in (waypoints or set()))
+    # A frozenset is taken as already normalized (uppercase tokens, the form
+    # generate_ass builds once per run); only ad-hoc inputs pay for the
+    # per-call upper/copy.
+    if not isinstance(waypoints, frozenset):
+        waypoints = frozenset(w.upper() for w in (waypoints or ()))
     visited = set(visited_acronyms or ())
 
     total = 0
-    for token in text.split():
+    # Explicit LIFO work stack instead of recursing per acronym expansion:
+    # each frame is (token, visited-set of its expansion level). Tokens of the
+    # same level share one set; expanding an acronym pushes its sub-tokens with
+    # a copy so sibling tokens keep seeing the parent's state.
+    work: list[tuple[str, set[str]]] = [(token, visited) for token in reversed(text.split())]
+    while work:
+        token, visited = work.pop()
         # Strip surrounding punctuation for token classification, but keep punctuation in base count below.
-        stripped = token.strip(".,!?;:()[]{}\"'")
+        # Most tokens have clean edges; only pay for the strip copy when needed.
+        if token[0] in _EDGE_PUNCT_SET or token[-1] in _EDGE_PUNCT_SET:
+            stripped = token.strip(_EDGE_PUNCT)
+        else:
+            stripped = token
 
         # 1) Acronym expansion timing comes first (before any NATO/digit logic).
         # Support both exact token matches ("FL") and common prefix+digits patterns ("FL350").
+        # Only the full leading run of uppercase letters can match, so one
+        # anchored regex match plus one dict lookup replaces the old
+        # per-length slice probing.
         prefix = ""
         suffix = ""
-        if stripped:
-            k = 0
-            while k < len(stripped) and stripped[k].isalpha() and stripped[k].isupper():
-                k += 1
-            prefix = stripped[:k]
-            suffix = stripped[k:]
-
-        if prefix and prefix in acronyms:
-            # Avoid infinite recursion when acronym expansions reference each other.
+        if acronyms and stripped:
+            m = _UPPER_RUN_RE.match(stripped)
+            if m and m.group(0) in acronyms:
+                prefix = m.group(0)
+                suffix = stripped[m.end():]
+
+        if prefix:
+            # Avoid infinite expansion when acronym expansions reference each other.
             if prefix in visited:
                 # Already expanding this acronym in the current chain — treat literally (fall through).
                 pass
             else:
                 # Speak the expansion (normal words) + then process the suffix (often digits).
-                # Preserve the acronyms mapping so nested expansions work, tracking visited keys.
+                # Suffix is pushed first so the expansion's tokens are counted before it,
+                # mirroring the original evaluation order.
                 visited.add(prefix)
-                total += estimate_spoken_length(
-                    acronyms[prefix],
-                    acronyms=acronyms,
-                    waypoints=waypoints,
-                    visited_acronyms=visited,
-                )
+                total += 1  # space boundary after token
                 if suffix:
                     total += 1  # word boundary
-                    total += estimate_spoken_length(
-                        suffix,
-                        acronyms=acronyms,
-                        waypoints=waypoints,
-                        visited_acronyms=visited,
-                    )
-                total += 1  # space boundary after token
+                    work.append((suffix, visited))
+                expansion_visited = set(visited)
+                for sub in reversed(acronyms[prefix].split()):
+                    work.append((sub, expansion_visited))
                 continue
 
         # 2) NATO expansion for ALL-UPPERCASE tokens only.
-        # Avoid NATO when any uppercase letter is followed by a lowercase letter (e.g. "A321neo").
-        has_upper_followed_by_lower = any(
-            stripped[i].isupper() and stripped[i + 1].islower()
-            for i in range(len(stripped) - 1)
-        )
-
+        # isascii + isalnum restricts to [A-Za-z0-9]; isupper then requires at
+        # least one letter and no lowercase, leaving exactly the A-Z0-9 tokens
+        # with an uppercase letter. Tokens with any lowercase (e.g. "A321neo")
+        # fail isupper, so no separate mixed-case scan is needed.
         is_all_caps_token = (
             stripped
-            and not has_upper_followed_by_lower
-            and all(ch.isupper() or ch.isdigit() for ch in stripped)
-            and any(ch.isalpha() for ch in stripped)
+            and stripped.isascii()
+            and stripped.isalnum()
+            and stripped.isupper()
         )
 
         # If this token is a declared waypoint, treat it literally (no NATO expansion).
         if is_all_caps_token and stripped.upper() not in waypoints:
-            for ch in stripped:
-                if ch.isdigit():
-                    total += _DIGIT_WORD_LEN.get(ch, 1) + 1  # + space
-                elif ch.isupper():
-                    total += _NATO_LEN.get(ch, 1) + 1  # + space
+            # All characters are uppercase ASCII letters or digits here, so
+            # the byte table always has an entry.
+            total += sum(map(_CAPS_LUT.__getitem__, stripped.encode("ascii")))
+            continue
+
+        # Normal token: expand digits only.
+        # Tokens without a dot can't contain "decimal", so they sum straight
+        # through the byte table; the slow loop below only handles dots and
+        # non-ASCII.
+        if "." not in token and token.isascii():
+            total += sum(map(_NORMAL_LUT.__getitem__, token.encode("ascii"))) + 1
             continue
 
-        # Normal token: expand digits only
         # Treat any dot between two digits as the spoken word "decimal".
         for idx, ch in enumerate(token):
             # Handle dot between two digits as "decimal"
@@ -139,21 +201,32 @@ def estimate_spoken_length(
                 ch == "."
                 and idx > 0
                 and idx < len(token) - 1
-                and token[idx - 1].isdigit()
-                and token[idx + 1].isdigit()
+                and token[idx - 1] in _DIGITS
+                and token[idx + 1] in _DIGITS
             ):
                 total += len("decimal")
                 continue
-            if ch.isdigit():
-                total += _DIGIT_WORD_LEN.get(ch, 1)
-            else:
-                total += 1
+            total += _NORMAL_SPOKEN_LEN.get(ch, 1)
 
         # Add a space boundary
         total += 1
 
     return max(0, total)
 
+def estimate_duration_ms(
+    text: str,
+    cps: float = 15.0,
+    acronyms: dict[str, str] | None = None,
+    waypoints: set[str] | None = None,
+) -> int:
+    """
+    Estimate speaking duration in integer milliseconds using characters-per-second.
+    No minimum.
+    """
+    spoken_len = estimate_spoken_length(text, acronyms=acronyms, waypoints=waypoints)
+    seconds = spoken_len / max(0.001, cps)
+    return int(seconds * 1000)
+
 def estimate_duration(
     text: str,
     cps: float = 15.0,
@@ -164,6 +237,4 @@ def estimate_duration(
     Estimate speaking duration using characters-per-second.
     No minimum.
     """
-    spoken_len = estimate_spoken_length(text, acronyms=acronyms, waypoints=waypoints)
-    seconds = spoken_len / max(0.001, cps)
-    return timedelta(milliseconds=int(seconds * 1000))
+    return timedelta(milliseconds=estimate_duration_ms(text, cps=cps, acronyms=acronyms, waypoints=waypoints))
@@ -1,4 +1,6 @@
-from effective_config import get_effective_speaker_str
+import functools
+
+from effective_config import pick_str, resolve_speaker_scope
 
 def get_speaker_style(
     speaker_key: str,
@@ -13,44 +15,29 @@ def get_speaker_style(
     2) Type defaults under [speakerTypes.<Type>] or [metaTypes.<Type>]
     3) Hard-coded defaults
     """
-    meta = meta or {}
+    # Walk the speaker->type chain once for all four attributes.
+    speaker_info, type_info = resolve_speaker_scope(
+        speaker_key, speakers=speakers, types=types, meta=meta or {}
+    )
+
+    def pick(attr: str, default: str) -> str:
+        return pick_str(speaker_info.get(attr), type_info.get(attr), default=default)
 
     # Position normalization is handled separately so callers can map to ASS alignments.
     return {
-        "display_name": get_effective_speaker_str(
-            speaker_key,
-            "name",
-            speakers=speakers,
-            types=types,
-            meta=meta,
-            default=speaker_key,
-        ),
-        "position": get_effective_speaker_str(
-            speaker_key,
-            "position",
-            speakers=speakers,
-            types=types,
-            meta=meta,
-            default="bottom-left",
-        ),
-        "color": get_effective_speaker_str(
-            speaker_key,
-            "color",
-            speakers=speakers,
-            types=types,
-            meta=meta,
-            default="white",
-        ),
-        "background": get_effective_speaker_str(
-            speaker_key,
-            "background",
-            speakers=speakers,
-            types=types,
-            meta=meta,
-            default="none",
-        ),
+        "display_name": pick("name", speaker_key),
+        "position": pick("position", "bottom-left"),
+        "color": pick("color", "white"),
+        "background": pick("background", "none"),
     }
 
+_VERTICAL_MAP = {"top": "top", "middle": "middle", "center": "middle", "bottom": "bottom"}
+_HORIZONTAL_MAP = {"left": "left", "center": "center", "right": "right", "middle": "center"}
+_CANONICAL_POSITIONS = frozenset(
+    f"{v}-{h}" for v in ("top", "middle", "bottom") for h in ("left", "center", "right")
+)
+
+@functools.lru_cache(maxsize=64)
 def _normalize_position(pos: str | None) -> str:
     """Normalize a position string into one of the nine canonical tokens:
     '<vertical>-<horizontal>' where vertical in (top,middle,bottom) and
@@ -67,8 +54,12 @@ def _normalize_position(pos: str | None) -> str:
     p = pos.strip().lower()
     p = p.replace("_", "-")
 
-    vertical_map = {"top": "top", "middle": "middle", "center": "middle", "bottom": "bottom"}
-    horizontal_map = {"left": "left", "center": "center", "right": "right", "middle": "center"}
+    # Fast path: already one of the nine canonical tokens.
+    if p in _CANONICAL_POSITIONS:
+        return p
+
+    vertical_map = _VERTICAL_MAP
+    horizontal_map = _HORIZONTAL_MAP
 
     parts = [part for part in p.split("-") if part]
     if len(parts) == 1:
@@ -96,6 +87,18 @@ def _normalize_position(pos: str | None) -> str:
 
     return "bottom-left"
 
+_ALIGNMENT = {
+    "bottom-left": 1,
+    "bottom-center": 2,
+    "bottom-right": 3,
+    "middle-left": 4,
+    "middle-center": 5,
+    "middle-right": 6,
+    "top-left": 7,
+    "top-center": 8,
+    "top-right": 9,
+}
+
 def position_to_alignment(pos: str | None) -> int:
     """Map normalized position to ASS alignment (1-9).
 
@@ -104,16 +107,4 @@ def position_to_alignment(pos: str | None) -> int:
       middle-left=4, middle-center=5, middle-right=6,
       top-left=7, top-center=8, top-right=9
     """
-    norm = _normalize_position(pos)
-    mapping = {
-        "bottom-left": 1,
-        "bottom-center": 2,
-        "bottom-right": 3,
-        "middle-left": 4,
-        "middle-center": 5,
-        "middle-right": 6,
-        "top-left": 7,
-        "top-center": 8,
-        "top-right": 9,
-    }
-    return mapping.get(norm, 1)
+    return _ALIGNMENT.get(_normalize_position(pos), 1)
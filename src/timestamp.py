@@ -1,15 +1,7 @@
 from datetime import timedelta
 
-def parse_timestamp_to_timedelta(value: str, fmt: str) -> timedelta:
-    """
-    Parse a T=... tag timestamp according to the INI-defined format.
-
-    Supported fmt tokens:
-      - ss
-      - mm:ss
-      - hh:mm:ss
-    Optional fractional milliseconds are supported by appending .ms to the value.
-    """
+def _split_timestamp(value: str) -> tuple[list[str], int]:
+    """Split a timestamp value into its colon-separated parts and fractional ms."""
     s = value.strip()
     if not s:
         raise ValueError("Empty timestamp")
@@ -17,7 +9,10 @@ def parse_timestamp_to_timedelta(value: str, fmt: str) -> timedelta:
     ms = 0
     if "." in s:
         left, frac = s.split(".", 1)
-        frac = "".join(ch for ch in frac if ch.isdigit())
+        # Fractions are plain digits in practice; only pay for the
+        # per-character filter when something else slipped in.
+        if not frac.isdigit():
+            frac = "".join(ch for ch in frac if ch.isdigit())
         if frac:
             if len(frac) >= 3:
                 ms = int(frac[:3])
@@ -25,27 +20,42 @@ def parse_timestamp_to_timedelta(value: str, fmt: str) -> timedelta:
                 ms = int(frac.ljust(3, "0"))
         s = left
 
-    parts = s.split(":")
-    fmt = fmt.strip().lower()
-
-    if fmt == "ss":
-        if len(parts) != 1:
-            raise ValueError(f"Timestamp {value!r} does not match format {fmt!r}")
-        return timedelta(seconds=int(parts[0]), milliseconds=ms)
-
-    if fmt == "mm:ss":
-        if len(parts) != 2:
-            raise ValueError(f"Timestamp {value!r} does not match format {fmt!r}")
-        return timedelta(minutes=int(parts[0]), seconds=int(parts[1]), milliseconds=ms)
-
-    if fmt == "hh:mm:ss":
-        if len(parts) != 3:
-            raise ValueError(f"Timestamp {value!r} does not match format {fmt!r}")
-        return timedelta(
-            hours=int(parts[0]),
-            minutes=int(parts[1]),
-            seconds=int(parts[2]),
-            milliseconds=ms,
-        )
-
-    raise ValueError(f"Unsupported timestamp format in INI: {fmt!r}")
+    return s.split(":"), ms
+
+def make_timestamp_parser(fmt: str):
+    """
+    Bind a T= timestamp parser for a fixed INI-defined format, returning a
+    callable(value) -> int milliseconds. The format is validated once here
+    instead of on every parse call.
+
+    Supported fmt tokens:
+      - ss
+      - mm:ss
+      - hh:mm:ss
+    Optional fractional milliseconds are supported by appending .ms to the value.
+    """
+    fmt_norm = fmt.strip().lower()
+    try:
+        n_parts = ("ss", "mm:ss", "hh:mm:ss").index(fmt_norm) + 1
+    except ValueError:
+        raise ValueError(f"Unsupported timestamp format in INI: {fmt_norm!r}") from None
+    weights = (3600, 60, 1)[-n_parts:]
+
+    def parse(value: str) -> int:
+        parts, ms = _split_timestamp(value)
+        if len(parts) != n_parts:
+            raise ValueError(f"Timestamp {value!r} does not match format {fmt_norm!r}")
+        seconds = 0
+        for weight, part in zip(weights, parts):
+            seconds += weight * int(part)
+        return seconds * 1000 + ms
+
+    return parse
+
+def parse_timestamp_ms(value: str, fmt: str) -> int:
+    """Parse a T=... tag timestamp into integer ms (see make_timestamp_parser)."""
+    return make_timestamp_parser(fmt)(value)
+
+def parse_timestamp_to_timedelta(value: str, fmt: str) -> timedelta:
+    """Parse a T=... tag timestamp into a timedelta (see parse_timestamp_ms)."""
+    return timedelta(milliseconds=parse_timestamp_ms(value, fmt))
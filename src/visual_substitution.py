@@ -1,8 +1,8 @@
 import re
 from collections.abc import Mapping
 
+from effective_config import pick_str
 from ini_parsing import strip_outer_quotes
-from style import get_speaker_style
 
 def build_speaker_display_name_map(
     speakers: dict[str, dict[str, str]],
@@ -14,40 +14,59 @@ def build_speaker_display_name_map(
 
     This is used for *visual* substitutions inside subtitle text (and therefore affects
     CPS/duration estimation too, because we run substitutions before duration estimation).
+
+    Only the name attribute is resolved (speaker override, then type default,
+    then the key itself); the rest of the style is irrelevant here. Keys come
+    from [speakers.*] only, so `meta` is never consulted — the parameter is
+    kept for call-site symmetry with get_speaker_style.
     """
     out: dict[str, str] = {}
-    for speaker_key in speakers.keys():
-        style = get_speaker_style(speaker_key, speakers, types, meta)
-        out[speaker_key] = str(style.get("display_name") or speaker_key)
+    for speaker_key, info in speakers.items():
+        stype = (info.get("type") or "").strip()
+        type_info = types.get(stype, {}) if stype else {}
+        out[speaker_key] = pick_str(info.get("name"), type_info.get("name"), default=speaker_key)
     return out
 
-def substitute_speaker_ids(text: str, speaker_id_to_name: Mapping[str, str]) -> str:
+def _compile_speaker_sub(speaker_id_to_name: Mapping[str, str]) -> tuple[re.Pattern, dict[str, str], dict[int, None]] | None:
     """
-    Replace any occurrence of a speaker ID in the text with that speaker's display name.
+    Compile the effective speaker-ID -> display-name substitutions into one
+    alternation pattern, its replacement map, and a translate table deleting
+    the keys' first characters (used as a cheap reject: a line whose length
+    is unchanged by that deletion cannot contain any key).
+
+    Only IDs whose display name actually differs contribute, so configs
+    without renamed speakers compile to None and the per-line work is
+    skipped entirely. A single alternation scans each line once instead of
+    once per speaker key.
 
     Matching rule: replace only when the ID is not part of a larger alphanumeric token.
     This avoids replacing inside other words/callsigns.
     """
-    if not text:
+    repl: dict[str, str] = {}
+    for k, name in speaker_id_to_name.items():
+        if k and name and str(name) != k:
+            repl[k] = str(name)
+    if not repl:
+        return None
+
+    # Longer keys first so e.g. "ATC1" wins over "ATC" at the same position.
+    alt = "|".join(map(re.escape, sorted(repl, key=len, reverse=True)))
+    reject = str.maketrans("", "", "".join({k[0] for k in repl}))
+    # Boundary = not adjacent to an alphanumeric character.
+    # This allows punctuation around the key: "ATC1," "(ATC1)" etc.
+    return re.compile(rf"(?<![A-Za-z0-9])({alt})(?![A-Za-z0-9])"), repl, reject
+
+def substitute_speaker_ids(text: str, speaker_id_to_name: Mapping[str, str]) -> str:
+    """Replace any occurrence of a speaker ID in the text with that speaker's display name."""
+    if not text or not speaker_id_to_name:
         return text
-    if not speaker_id_to_name:
+    rule = _compile_speaker_sub(speaker_id_to_name)
+    if rule is None:
         return text
-
-    # Replace longer keys first to avoid partial replacements (e.g., "ATC1" before "ATC").
-    keys = sorted((k for k in speaker_id_to_name.keys() if k), key=len, reverse=True)
-
-    out = text
-    for k in keys:
-        name = speaker_id_to_name.get(k) or k
-        if not name or name == k:
-            continue
-
-        # Boundary = not adjacent to an alphanumeric character.
-        # This allows punctuation around the key: "ATC1," "(ATC1)" etc.
-        pattern = rf"(?<![A-Za-z0-9]){re.escape(k)}(?![A-Za-z0-9])"
-        out = re.sub(pattern, str(name), out)
-
-    return out
+    pattern, repl, reject = rule
+    if len(text.translate(reject)) == len(text):
+        return text
+    return pattern.sub(lambda m: repl[m.group(1)], text)
 
 def apply_visual_substitutions(
     *,
@@ -71,26 +90,52 @@ def apply_visual_substitutions(
     speaker_keys = set(speakers.keys())
     speaker_keys_with_name_prefix = speaker_keys_with_name_prefix or set()
 
+    # Rules are fixed for the run; compile the alternation once instead of
+    # re-sorting and re-building patterns per line.
+    sub_rule = _compile_speaker_sub(speaker_id_to_name)
+    if sub_rule is not None:
+        sub_pattern, sub_names, sub_reject = sub_rule
+
+        def _sub_name(m: re.Match) -> str:
+            return sub_names[m.group(1)]
+
+    # Repeated literals ("Roger", waypoint names, ...) are common; remember
+    # each raw value's prepared form so duplicates skip the quote stripping
+    # and substitution work. Prefixed lines key on the speaker too, since the
+    # prepared text embeds the display name.
+    prepared_cache: dict[tuple[str, str], str] = {}
+
     prepared: list[tuple[str, str]] = []
     for idx, (k, v) in enumerate(comms_lines):
         if idx in marker_indices:
             prepared.append((k, v))
             continue
 
-        text = strip_outer_quotes(v)
-
         # Optional speaker-name prefix rendering (e.g. "JET = ..." -> "N178QS: ...").
         # Done via the existing substitution pipeline by prepending "<KEY> = " and then:
         # 1) applying speaker-ID -> display-name substitutions
         # 2) converting the first "=" to ":" for display
-        if k in speaker_keys_with_name_prefix and k in speaker_keys:
+        has_name_prefix = k in speaker_keys_with_name_prefix and k in speaker_keys
+
+        cache_key = (k if has_name_prefix else "", v)
+        cached = prepared_cache.get(cache_key)
+        if cached is not None:
+            prepared.append((k, cached))
+            continue
+
+        text = strip_outer_quotes(v)
+        if has_name_prefix:
             text = f"{k} = {text}" if text else f"{k} ="
 
-        text = substitute_speaker_ids(text, speaker_id_to_name)
+        # Reject-first: most lines contain none of the keys' first characters,
+        # and the C-level translate settles that without entering the regex.
+        if text and sub_rule is not None and len(text.translate(sub_reject)) != len(text):
+            text = sub_pattern.sub(_sub_name, text)
 
-        if k in speaker_keys_with_name_prefix and k in speaker_keys:
+        if has_name_prefix:
             text = re.sub(r"\s*=\s*", ": ", text, count=1)
 
+        prepared_cache[cache_key] = text
         prepared.append((k, text))
 
     return prepared